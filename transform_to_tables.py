@@ -5,10 +5,9 @@ Transform CMS HHA cost report CSVs into:
   2. operators_annual.csv - one row per operator per year, financials rolled up
 """
 
-import csv
-import re
 from pathlib import Path
-from collections import defaultdict
+
+import pandas as pd
 
 PROJECT_DIR = Path(__file__).resolve().parent
 YEARS = (2020, 2021, 2022, 2023)
@@ -75,81 +74,61 @@ PROVIDER_COLUMNS = [
 ]
 
 
-def normalize_operator_name(name: str) -> str:
-    """Normalize HHA name for grouping into operators (multi-site)."""
-    if not name or not name.strip():
-        return ""
-    s = name.strip().upper()
-    s = re.sub(r"\s+", " ", s)
-    return s
+def normalize_operator_names(names: pd.Series) -> pd.Series:
+    """Normalize HHA names for grouping into operators (multi-site): strip, uppercase, collapse whitespace."""
+    return names.str.strip().str.upper().str.replace(r"\s+", " ", regex=True)
 
 
-def safe_float(val, default=None):
-    if val is None or (isinstance(val, str) and not val.strip()):
-        return default
-    try:
-        s = str(val).replace(",", "").strip()
-        return float(s) if s else default
-    except (ValueError, TypeError):
-        return default
+PROVIDER_COLUMN_SET = frozenset(PROVIDER_COLUMNS)
 
+# Rows held in memory per read; bounds the transform's working set however large
+# a yearly CSV grows.
+CHUNK_ROWS = 200_000
 
-def load_year(path: Path) -> tuple[list[str], list[dict]]:
-    """Return (headers, list of row dicts)."""
-    with open(path, newline="", encoding="utf-8", errors="replace") as f:
-        r = csv.DictReader(f)
-        headers = r.fieldnames or []
-        rows = list(r)
-    return headers, rows
 
+def iter_year_chunks(path: Path, columns=None):
+    """Stream one year's cost report CSV in bounded chunks, all values as str.
+
+    Bulk C-level parsing with column projection at read time replaces the old
+    per-row DictReader; blanks come back as "" (not NaN) so downstream handling
+    matches the DictReader behavior. `columns` narrows the projection further
+    (e.g. the names-only pass).
+    """
+    usecols = columns if columns is not None else (lambda c: c in PROVIDER_COLUMN_SET)
+    yield from pd.read_csv(
+        path,
+        usecols=usecols,
+        dtype=str,
+        encoding="utf-8",
+        encoding_errors="replace",
+        keep_default_na=False,
+        chunksize=CHUNK_ROWS,
+    )
 
-def main():
-    # 1) Load all years and build global normalized name -> operator_id
-    all_rows_by_year: dict[int, list[dict]] = {}
-    normalized_to_id: dict[str, int] = {}
-    next_operator_id = 1
 
+def main():
+    paths: dict[int, Path] = {}
     for year in YEARS:
         path = PROJECT_DIR / str(year) / f"CostReporthha_Final_{year % 100:02d}.csv"
         if not path.exists():
             raise FileNotFoundError(path)
-        headers, rows = load_year(path)
-        for row in rows:
-            name = (row.get("HHA Name") or "").strip()
-            norm = normalize_operator_name(name)
-            if norm and norm not in normalized_to_id:
-                normalized_to_id[norm] = next_operator_id
-                next_operator_id += 1
-        all_rows_by_year[year] = rows
-
-    # 2) Build providers_annual: one row per (CCN, year) with selected columns + operator_id, year
-    provider_headers = ["year", "operator_id"] + [c for c in PROVIDER_COLUMNS if c != "HHA Name"]
-    # Keep HHA Name in output; add after operator_id
-    provider_headers = ["year", "operator_id", "HHA Name"] + [
-        c for c in PROVIDER_COLUMNS if c != "HHA Name"
-    ]
-    provider_out_path = PROJECT_DIR / "providers_annual.csv"
-
-    with open(provider_out_path, "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=provider_headers, extrasaction="ignore")
-        w.writeheader()
+        paths[year] = path
 
-        for year in YEARS:
-            rows = all_rows_by_year[year]
-            for row in rows:
-                name = (row.get("HHA Name") or "").strip()
-                norm = normalize_operator_name(name)
-                operator_id = normalized_to_id.get(norm, "")
+    # 1) Names-only pass: build global normalized name -> operator_id.
+    # factorize keeps first-occurrence order, matching the old incremental dict:
+    # ids are still assigned 1, 2, ... in the order names first appear across years.
+    all_norm = pd.concat(
+        [
+            normalize_operator_names(chunk["HHA Name"])
+            for year in YEARS
+            for chunk in iter_year_chunks(paths[year], columns=["HHA Name"])
+        ],
+        ignore_index=True,
+    )
+    uniques = pd.factorize(all_norm[all_norm != ""])[1]
+    normalized_to_id = {name: i + 1 for i, name in enumerate(uniques)}
+    del all_norm
 
-                out = {"year": year, "operator_id": operator_id if operator_id else ""}
-                for col in PROVIDER_COLUMNS:
-                    if col in row:
-                        out[col] = row[col]
-                w.writerow(out)
-
-    print(f"Wrote {provider_out_path} with {sum(len(all_rows_by_year[y]) for y in YEARS)} rows")
-
-    # 3) Build operators_annual: one row per (operator_id, year) with rolled-up financials
     # Sum: revenue, cost, visits, income, assets, liabilities; count: CCNs, states; canonical name
     sum_cols = [
         "Gross Patient Revenues Title XVIII Medicare",
@@ -188,51 +167,102 @@ def main():
         "state_codes",
     ] + sum_cols
 
-    agg_by_key: dict[tuple[int, int], dict] = defaultdict(lambda: {k: 0.0 for k in sum_cols})
-    names_by_key: dict[tuple[int, int], list[str]] = defaultdict(list)
-    ccns_by_key: dict[tuple[int, int], set] = defaultdict(set)
-    states_by_key: dict[tuple[int, int], set] = defaultdict(set)
+    # 2+3) Stream the full rows once: append each chunk to providers_annual.csv
+    # through pandas' C CSV writer (CRLF keeps the output byte-identical to the
+    # old DictWriter) and keep only reduced per-chunk rollup partials, so peak
+    # memory stays bounded by CHUNK_ROWS however large a yearly file gets.
+    provider_headers = ["year", "operator_id", "HHA Name"] + [
+        c for c in PROVIDER_COLUMNS if c != "HHA Name"
+    ]
+    provider_out_path = PROJECT_DIR / "providers_annual.csv"
+
+    n_provider_rows = 0
+    sum_parts = []  # per-chunk (year, operator_id) sums
+    name_parts = []  # per-chunk (year, operator_id, HHA Name) counts
+    ccn_parts = []  # per-chunk unique (year, operator_id, Provider CCN)
+    state_parts = []  # per-chunk unique non-blank (year, operator_id, State Code)
 
+    first = True
     for year in YEARS:
-        for row in all_rows_by_year[year]:
-            name = (row.get("HHA Name") or "").strip()
-            norm = normalize_operator_name(name)
-            operator_id = normalized_to_id.get(norm)
-            if not operator_id:
-                continue
-            key = (year, operator_id)
-            names_by_key[key].append(name)
-            ccns_by_key[key].add((row.get("Provider CCN") or "").strip())
-            state = (row.get("State Code") or "").strip()
-            if state:
-                states_by_key[key].add(state)
+        for chunk in iter_year_chunks(paths[year]):
+            norm = normalize_operator_names(chunk["HHA Name"])
+            ids = norm.map(normalized_to_id)
+
+            out = chunk.copy()
+            out["year"] = year
+            out["operator_id"] = ids.astype("Int64")
+            out.to_csv(
+                provider_out_path,
+                mode="w" if first else "a",
+                header=first,
+                index=False,
+                columns=provider_headers,
+                lineterminator="\r\n",
+            )
+            first = False
+            n_provider_rows += len(out)
+
+            # Rollup partials: numeric cleanup and sums run in pandas' C kernels
+            # instead of a Python loop parsing ~25 cells per row.
+            keep = ids.notna()
+            sub = pd.DataFrame({"year": year, "operator_id": ids[keep].astype("int64")})
+            for col in ("HHA Name", "Provider CCN", "State Code"):
+                sub[col] = chunk.loc[keep, col].str.strip()
             for col in sum_cols:
-                val = safe_float(row.get(col), 0)
-                if val is not None:
-                    agg_by_key[key][col] = agg_by_key[key].get(col, 0) + val
+                sub[col] = pd.to_numeric(
+                    chunk.loc[keep, col].str.replace(",", "", regex=False), errors="coerce"
+                ).fillna(0.0)
+
+            sum_parts.append(sub.groupby(["year", "operator_id"])[sum_cols].sum())
+            name_parts.append(sub.value_counts(["year", "operator_id", "HHA Name"], sort=False))
+            ccn_parts.append(sub[["year", "operator_id", "Provider CCN"]].drop_duplicates())
+            state_parts.append(
+                sub.loc[sub["State Code"] != "", ["year", "operator_id", "State Code"]].drop_duplicates()
+            )
+
+    print(f"Wrote {provider_out_path} with {n_provider_rows} rows")
+
+    # Reduce the partials. Name counts re-sum across chunks, then the canonical
+    # name per group is the most frequent one (alphabetically first on ties,
+    # like Series.mode().iat[0]).
+    sums = pd.concat(sum_parts).groupby(level=["year", "operator_id"]).sum()
+    name_counts = pd.concat(name_parts).groupby(level=[0, 1, 2]).sum().reset_index(name="n")
+    name_counts = name_counts.sort_values(
+        ["year", "operator_id", "n", "HHA Name"],
+        ascending=[True, True, False, True],
+        kind="stable",
+    )
+    names = name_counts.drop_duplicates(["year", "operator_id"]).set_index(
+        ["year", "operator_id"]
+    )["HHA Name"]
+    ccns = (
+        pd.concat(ccn_parts)
+        .drop_duplicates()
+        .groupby(["year", "operator_id"])["Provider CCN"]
+        .nunique()
+    )
+
+    st = pd.concat(state_parts).drop_duplicates()
+    st = st.sort_values(["year", "operator_id", "State Code"])
+    states_grouped = st.groupby(["year", "operator_id"])["State Code"]
+    state_codes = states_grouped.agg("|".join).reindex(sums.index, fill_value="")
+    n_states = states_grouped.size().reindex(sums.index, fill_value=0)
+
+    out_df = pd.DataFrame(
+        {
+            "operator_name": names,
+            "n_ccns": ccns,
+            "n_states": n_states,
+            "state_codes": state_codes,
+        }
+    ).join(sums).reset_index()
+    out_df = out_df[operator_headers]
 
     operator_out_path = PROJECT_DIR / "operators_annual.csv"
-    with open(operator_out_path, "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=operator_headers)
-        w.writeheader()
-        for (year, operator_id), sums in sorted(agg_by_key.items()):
-            names = names_by_key.get((year, operator_id), [])
-            operator_name = max(set(names), key=names.count) if names else ""
-            ccns = ccns_by_key.get((year, operator_id), set())
-            states = sorted(states_by_key.get((year, operator_id), set()))
-            row = {
-                "year": year,
-                "operator_id": operator_id,
-                "operator_name": operator_name,
-                "n_ccns": len(ccns),
-                "n_states": len(states),
-                "state_codes": "|".join(states) if states else "",
-            }
-            for col in sum_cols:
-                row[col] = sums.get(col, 0)
-            w.writerow(row)
+    # CRLF matches the committed artifact (written by csv.writer originally).
+    out_df.to_csv(operator_out_path, index=False, lineterminator="\r\n")
 
-    print(f"Wrote {operator_out_path} with {len(agg_by_key)} rows")
+    print(f"Wrote {operator_out_path} with {len(out_df)} rows")
 
 
 if __name__ == "__main__":